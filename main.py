@@ -1,17 +1,35 @@
 import os
+import gzip
 import json
+import time
+import tempfile
+import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
-from jinja2 import Template
-from itertools import cycle
+from jinja2 import Environment, DictLoader, FileSystemBytecodeCache
+from markupsafe import Markup
+from operator import itemgetter
+
+try:
+    import orjson  # optional, faster cache (de)serialization
+except ImportError:
+    orjson = None
+
+log = logging.getLogger(__name__)
 
 # Configuration fields
+DEBUG = False  # True => print assignment diagnostics to the console
 API_USERNAME = ""
 API_PASSWORD = ""
 SEASON = 2024
 EVENT_CODE = "BCVI"
 TOURNAMENT_LEVEL = "qualification"  # Options: "practice" or "qualification"
-CACHE_FILE = "schedule_cache.json"
+CACHE_FILE = "schedule_cache.json.gz"
+TEMPLATE_CACHE_DIR = ".jinja_cache"  # compiled templates, reused across runs
+CACHE_MIN_REFETCH_SECONDS = 60  # reuse a cache this fresh without asking the API
+API_TIMEOUT_SECONDS = 10  # connect/read timeout for each API request
 SCOUTING_MEMBERS = [
     "Alex Carter", "Jordan Smith", "Taylor Johnson", "Morgan Davis", "Casey Brown",
     "Riley Wilson", "Jamie Anderson", "Drew Thompson", "Peyton Martinez", "Quinn Moore",
@@ -22,182 +40,51 @@ MIN_TEAMS_PER_MEMBER = 4
 MIN_MEMBERS_PER_TEAM = 2
 LUNCH_BREAK_THRESHOLD_MINUTES = 60
 GAP_UNDERLINE_THRESHOLD_MINUTES = 15
-EXCLUDED_TEAMS = [9999, 8888, 5516]
-
-
-def fetch_schedule():
-    url = f"https://frc-api.firstinspires.org/v3.0/{SEASON}/schedule/{EVENT_CODE}?tournamentLevel={TOURNAMENT_LEVEL}"
-    response = requests.get(url, auth=(API_USERNAME, API_PASSWORD))
-    if response.status_code == 200:
-        return response.json()
-    else:
-        raise Exception(f"Failed to fetch schedule: {response.status_code} {response.reason}")
-
-
-def save_cache(data):
-    with open(CACHE_FILE, "w") as f:
-        json.dump(data, f)
-
-
-def load_cache():
-    if os.path.exists(CACHE_FILE):
-        with open(CACHE_FILE, "r") as f:
-            return json.load(f)
-    return None
-
-
-def insert_all_teams_done(schedule):
-    """
-    Insert a single 'AllTeamsDone' row after the match in which
-    all teams (excluded included) have appeared at least once.
-    """
-    all_teams = set()
-    for row in schedule:
-        if row["matchNumber"] not in ["Lunch Break", "Overnight", "AllTeamsDone"]:
-            all_teams.update(row["teams"])
-
-    encountered = set()
-    new_sched = []
-    inserted = False
-
-    s_sorted = sorted(schedule, key=lambda m: m["time"])
-
-    for row in s_sorted:
-        new_sched.append(row)
-        if row["matchNumber"] not in ["Lunch Break", "Overnight", "AllTeamsDone"]:
-            encountered.update(row["teams"])
-            if (not inserted) and (encountered == all_teams):
-                new_sched.append({
-                    "matchNumber": "AllTeamsDone",
-                    "time": "",
-                    "teams": []
-                })
-                inserted = True
-
-    return new_sched
+EXCLUDED_TEAMS = frozenset({9999, 8888, 5516})
 
+# Thresholds in whole seconds, so gap checks compare ints instead of float minutes
+LUNCH_BREAK_THRESHOLD_SECONDS = LUNCH_BREAK_THRESHOLD_MINUTES * 60
+GAP_UNDERLINE_THRESHOLD_SECONDS = GAP_UNDERLINE_THRESHOLD_MINUTES * 60
 
-def assign_scouting(schedule, members, min_teams, min_members):
-    print("DEBUG: Building assignments for non-excluded teams...")
-    assignments = {m: [] for m in members}
-    team_assignments = {}
-
-    for row in schedule:
-        if row["matchNumber"] not in ["Lunch Break", "Overnight", "AllTeamsDone"]:
-            for team in row["teams"]:
-                if team not in EXCLUDED_TEAMS:
-                    if team not in team_assignments:
-                        team_assignments[team] = []
-
-    print(f"DEBUG: Found {len(team_assignments)} non-excluded teams: {list(team_assignments.keys())}\n")
-
-    members_cycle = cycle(members)
-    for team in team_assignments:
-        while len(team_assignments[team]) < min_members:
-            mem = next(members_cycle)
-            if team not in assignments[mem]:
-                assignments[mem].append(team)
-                team_assignments[team].append(mem)
-        print(f"DEBUG: Team {team} => {team_assignments[team]}")
-
-    print("\nDEBUG: After ensuring min_members, assignments dictionary:")
-    for m in assignments:
-        print(f"  {m}: {assignments[m]}")
-
-    teams_cycle = cycle(team_assignments.keys())
-    for mem in assignments:
-        while len(assignments[mem]) < min_teams:
-            t = next(teams_cycle)
-            if t not in assignments[mem]:
-                assignments[mem].append(t)
-                team_assignments[t].append(mem)
+# Markup wrapped around long gaps in member schedules
+GAP_UNDERLINE_OPEN = "<span style='text-decoration: underline;'>"
+GAP_UNDERLINE_CLOSE = "</span>"
 
-    print("\nDEBUG: After ensuring min_teams, assignments dictionary (pre-purge):")
-    for m in assignments:
-        print(f"  {m}: {assignments[m]}")
+# matchNumber values of the synthetic rows mixed into the schedule
+BREAK_ROW_LABELS = frozenset({"Lunch Break", "Overnight", "AllTeamsDone"})
 
-    # Purge excluded
-    for m in assignments:
-        orig_count = len(assignments[m])
-        assignments[m] = [t for t in assignments[m] if t not in EXCLUDED_TEAMS]
-        if len(assignments[m]) < orig_count:
-            print(f"DEBUG: Purged excluded from {m}. => {assignments[m]}")
 
-    print("\nDEBUG: Final assignment dictionary (post-purge):")
-    for m in assignments:
-        print(f"  {m}: {assignments[m]}")
-
-    return assignments, team_assignments
-
-
-def generate_overall_schedule(schedule, assignments, team_assignments, generation_info):
-    annotated_schedule = []
-    previous_match_time = None
-
-    for row in schedule:
-        if row["matchNumber"] == "AllTeamsDone":
-            annotated_schedule.append({
-                "matchNumber": "AllTeamsDone",
-                "time": "",
-                "teams": [],
-                "assignedMembers": []
-            })
-            continue
-
-        match_time = datetime.strptime(row["time"], "%Y-%m-%dT%H:%M:%S")
-        if previous_match_time:
-            # priority => if date changes => overnight
-            if match_time.date() != previous_match_time.date():
-                annotated_schedule.append({
-                    "matchNumber": "Overnight",
-                    "time": "",
-                    "teams": [],
-                    "assignedMembers": []
-                })
-            else:
-                gap_min = (match_time - previous_match_time).total_seconds() / 60
-                if gap_min >= LUNCH_BREAK_THRESHOLD_MINUTES:
-                    annotated_schedule.append({
-                        "matchNumber": "Lunch Break",
-                        "time": "",
-                        "teams": [],
-                        "assignedMembers": []
-                    })
-
-        overall_assigned = []
-        for t in row["teams"]:
-            if t in team_assignments:
-                overall_assigned.append(f"<u>Team {t}</u>: {', '.join(team_assignments[t])}")
-            else:
-                overall_assigned.append(f"<i>Team {t} (Excluded)</i>")
-
-        annotated_schedule.append({
-            "matchNumber": row["matchNumber"],
-            "time": row["time"],
-            "teams": row["teams"],
-            "assignedMembers": overall_assigned
-        })
-
-        previous_match_time = match_time
-
-    template = Template(r"""
+# HTML template sources, compiled once at import via TEMPLATE_ENV below.
+# Both pages extend BASE_TEMPLATE_SOURCE, which holds the shared page skeleton.
+BASE_TEMPLATE_SOURCE = r"""
 <!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
-    <title>Overall Scouting Schedule - {{ generation_info }}</title>
+    <title>{% block heading %}{% endblock %} - {{ generation_info }}</title>
     <style>
         body { font-family: Arial, sans-serif; margin: 1in; }
         table { width: 100%; border-collapse: collapse; margin-bottom: 20px; }
         th, td { border: 1px solid black; padding: 8px; text-align: center; }
         th { background-color: #f2f2f2; }
-        .break { font-weight: bold; background-color: #ffd700; }
-        .allteamsdone { font-weight: bold; background-color: #90ee90; }
+        {% block style %}{% endblock %}
     </style>
 </head>
 <body>
-    <h1>Overall Scouting Schedule</h1>
+    <h1>{{ self.heading() }}</h1>
     <p><strong>Generated Info:</strong> {{ generation_info }}</p>
+{% block content %}{% endblock %}
+</body>
+</html>
+"""
+
+OVERALL_TEMPLATE_SOURCE = r"""{% extends "base" %}
+{% block heading %}Overall Scouting Schedule{% endblock %}
+{% block style %}
+        .break { font-weight: bold; background-color: #ffd700; }
+        .allteamsdone { font-weight: bold; background-color: #90ee90; }
+{% endblock %}
+{% block content %}
     <table>
         <thead>
             <tr>
@@ -210,7 +97,7 @@ def generate_overall_schedule(schedule, assignments, team_assignments, generatio
         <tbody>
             {% for row in annotated_schedule %}
             {% set row_class = '' %}
-            {% if row.matchNumber in ['Lunch Break', 'Overnight'] %}
+            {% if row.is_break %}
                 {% set row_class = 'break' %}
             {% elif row.matchNumber == 'AllTeamsDone' %}
                 {% set row_class = 'allteamsdone' %}
@@ -220,7 +107,7 @@ def generate_overall_schedule(schedule, assignments, team_assignments, generatio
                 <td>{{ row.matchNumber }}</td>
                 <td>{{ row.time }}</td>
                 <td>{{ row.teams|join(', ') }}</td>
-                <td>{{ row.assignedMembers|join('<br>')|safe }}</td>
+                <td>{{ row.assigned_html }}</td>
             </tr>
             {% endfor %}
         </tbody>
@@ -243,153 +130,24 @@ def generate_overall_schedule(schedule, assignments, team_assignments, generatio
             {% endfor %}
         </tbody>
     </table>
-</body>
-</html>
-""")
-    return template.render(annotated_schedule=annotated_schedule, generation_info=generation_info, assignments=assignments)
-
-
-def generate_member_schedule(member, schedule, team_assignments, assigned_teams, generation_info, full_assignments):
-    member_schedule = []
-    previous_assigned_match_time = None
-    previous_assigned_match_index = None
-    last_break_inserted = None
-
-    # Build top assigned-teams list with also assigned
-    assigned_teams_info = []
-    for t in assigned_teams:
-        also_members = []
-        for other_m, tlist in full_assignments.items():
-            if other_m != member and t in tlist:
-                also_members.append(other_m)
-        if also_members:
-            assigned_teams_info.append((t, ", ".join(also_members)))
-        else:
-            assigned_teams_info.append((t, ""))
+{% endblock %}
+"""
 
-    # sort by time to ensure chronological iteration
-    schedule_sorted = sorted(schedule, key=lambda row: row["time"])
-
-    for i, row in enumerate(schedule_sorted):
-        # skip break rows
-        if row["matchNumber"] in ["Lunch Break", "Overnight", "AllTeamsDone"]:
-            continue
-
-        # normal match row
-        assigned_team_for_this_member = None
-        for tm in row["teams"]:
-            if tm in assigned_teams and tm not in EXCLUDED_TEAMS:
-                assigned_team_for_this_member = tm
-                break
-
-        if assigned_team_for_this_member:
-            match_time = datetime.strptime(row["time"], "%Y-%m-%dT%H:%M:%S")
-
-            # Insert lunch/overnight if needed
-            if previous_assigned_match_time is not None:
-                gap_minutes = (match_time - previous_assigned_match_time).total_seconds() / 60
-                if match_time.date() != previous_assigned_match_time.date():
-                    member_schedule.append({
-                        "matchNumber": "Overnight",
-                        "time": "",
-                        "gap": "",
-                        "teams": []
-                    })
-                    last_break_inserted = "Overnight"
-                else:
-                    if gap_minutes >= LUNCH_BREAK_THRESHOLD_MINUTES:
-                        member_schedule.append({
-                            "matchNumber": "Lunch Break",
-                            "time": "",
-                            "gap": "",
-                            "teams": []
-                        })
-                        last_break_inserted = "Lunch Break"
-                    else:
-                        last_break_inserted = None
-            else:
-                last_break_inserted = None
-
-            # compute gap
-            if previous_assigned_match_time is None:
-                # first match for this member => 'First Match'
-                gap = "First Match"
-            elif last_break_inserted in ["Overnight", "Lunch Break"]:
-                gap = last_break_inserted
-            else:
-                # skip break rows in between
-                gap_start = previous_assigned_match_time
-                if previous_assigned_match_index is not None:
-                    for skip_i in range(previous_assigned_match_index + 1, len(schedule_sorted)):
-                        if schedule_sorted[skip_i]["matchNumber"] not in ["Lunch Break","Overnight","AllTeamsDone"]:
-                            gap_start_str = schedule_sorted[skip_i]["time"]
-                            gap_start = datetime.strptime(gap_start_str, "%Y-%m-%dT%H:%M:%S")
-                            break
-
-                diff = (match_time - gap_start).total_seconds() / 60
-                if diff <= 0:
-                    # 0 or negative => show 'N/A'
-                    gap = "N/A"
-                elif diff > GAP_UNDERLINE_THRESHOLD_MINUTES:
-                    gap = f"<span style='text-decoration: underline;'>{diff:.0f} minutes</span>"
-                else:
-                    gap = f"{diff:.0f} minutes"
-
-            used_underline = False
-            styled_teams = []
-            for t in row["teams"]:
-                if t in EXCLUDED_TEAMS:
-                    styled_teams.append(f"<i>Team {t} (Excluded)</i>")
-                elif t == assigned_team_for_this_member and not used_underline:
-                    styled_teams.append(
-                        f"<span class='team team-{t}' style='text-decoration: underline;'>Team {t}</span>"
-                    )
-                    used_underline = True
-                else:
-                    styled_teams.append(f"<span class='team team-{t}'>Team {t}</span>")
-
-            member_schedule.append({
-                "matchNumber": row["matchNumber"],
-                "time": row["time"],
-                "gap": gap,
-                "teams": styled_teams,
-            })
-
-            previous_assigned_match_time = match_time
-            previous_assigned_match_index = i
-
-    # Render
-    template = Template(r"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <title>{{ member }}'s Scouting Schedule - {{ generation_info }}</title>
-    <style>
-        body { font-family: Arial, sans-serif; margin: 1in; }
-        table { width: 100%; border-collapse: collapse; margin-bottom: 20px; }
-        th, td { border: 1px solid black; padding: 8px; text-align: center; }
-        th { background-color: #f2f2f2; }
+MEMBER_TEMPLATE_SOURCE = r"""{% extends "base" %}
+{% block heading %}{{ member }}'s Scouting Schedule{% endblock %}
+{% block style %}
         .team { padding: 5px; font-weight: bold; }
         .excluded { font-style: italic; }
         .break-row { font-weight: bold; background-color: #ffd700; }
-        {% for (tt,others) in assigned_teams_info %}
-        .team-{{ tt }} {
-            background-color: hsl({{ loop.index0 * 60 }}, 70%, 90%);
-            border: 1px solid black;
-        }
-        {% endfor %}
+        {{ team_css }}
         @media print {
             .team {
                 -webkit-print-color-adjust: exact;
                 print-color-adjust: exact;
             }
         }
-    </style>
-</head>
-<body>
-    <h1>{{ member }}'s Scouting Schedule</h1>
-    <p><strong>Generated Info:</strong> {{ generation_info }}</p>
+{% endblock %}
+{% block content %}
 
     <h2>Assigned Teams:</h2>
     <ul>
@@ -414,33 +172,544 @@ def generate_member_schedule(member, schedule, team_assignments, assigned_teams,
         </thead>
         <tbody>
         {% for match in member_schedule %}
-            <tr class="{% if match.matchNumber in ['Lunch Break', 'Overnight'] %}break-row{% endif %}">
+            <tr class="{% if match.is_break %}break-row{% endif %}">
                 <td>{{ match.matchNumber }}</td>
                 <td>{{ match.time }}</td>
-                <td>{{ match.gap|safe }}</td>
-                <td>{{ match.teams|join(', ')|safe }}</td>
+                <td>{{ match.gap }}</td>
+                <td>{{ match.teams|join(', ') }}</td>
             </tr>
         {% endfor %}
         </tbody>
     </table>
-</body>
-</html>
-""")
-    return template.render(
+{% endblock %}
+"""
+
+# The templates only emit trusted markup built by this script, so autoescape
+# stays off; trim/lstrip_blocks drop the whitespace-only lines block tags leave.
+# The bytecode cache lets later runs skip lexing/parsing/compiling entirely;
+# it is best-effort, so an unwritable directory just means compiling each run.
+try:
+    os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+except OSError:
+    pass
+if os.path.isdir(TEMPLATE_CACHE_DIR) and os.access(TEMPLATE_CACHE_DIR, os.W_OK):
+    TEMPLATE_BYTECODE_CACHE = FileSystemBytecodeCache(directory=TEMPLATE_CACHE_DIR)
+else:
+    TEMPLATE_BYTECODE_CACHE = None
+TEMPLATE_ENV = Environment(
+    loader=DictLoader({
+        "base": BASE_TEMPLATE_SOURCE,
+        "overall": OVERALL_TEMPLATE_SOURCE,
+        "member": MEMBER_TEMPLATE_SOURCE
+    }),
+    bytecode_cache=TEMPLATE_BYTECODE_CACHE,
+    autoescape=False,
+    trim_blocks=True,
+    lstrip_blocks=True,
+    optimized=True,
+    cache_size=-1,
+    auto_reload=False
+)
+OVERALL_TEMPLATE = TEMPLATE_ENV.get_template("overall")
+MEMBER_TEMPLATE = TEMPLATE_ENV.get_template("member")
+
+
+# Shared HTTP session: keep-alive connection pool plus retry/backoff on transient failures
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.auth = (API_USERNAME, API_PASSWORD)
+HTTP_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504), raise_on_status=False)
+))
+
+
+def schedule_url():
+    return f"https://frc-api.firstinspires.org/v3.0/{SEASON}/schedule/{EVENT_CODE}?tournamentLevel={TOURNAMENT_LEVEL}"
+
+
+def fetch_schedule(etag=None, last_modified=None):
+    """
+    GET the schedule, sending any cached validators as a conditional request.
+    Returns (data, headers); data is None when the API answers 304 Not Modified.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    response = HTTP_SESSION.get(schedule_url(), headers=headers, timeout=API_TIMEOUT_SECONDS)
+    if response.status_code == 304:
+        return None, response.headers
+    if response.status_code == 200:
+        data = orjson.loads(response.content) if orjson is not None else response.json()
+        return data, response.headers
+    else:
+        raise Exception(f"Failed to fetch schedule: {response.status_code} {response.reason}")
+
+
+def save_cache(schedule, etag=None, last_modified=None):
+    """
+    Write the normalized schedule rows (see parse_schedule) as gzip-compressed JSON,
+    together with the request URL and the response validators for revalidation.
+    The file is written beside CACHE_FILE and swapped in, so an interrupted
+    write never leaves a truncated cache behind.
+    """
+    cache = {"url": schedule_url(), "etag": etag, "last_modified": last_modified, "schedule": schedule}
+    payload = orjson.dumps(cache) if orjson is not None else json.dumps(cache, separators=(",", ":")).encode("utf-8")
+    try:
+        mode = os.stat(CACHE_FILE).st_mode & 0o777  # keep the existing file's permissions
+    except OSError:
+        umask = os.umask(0)  # no cache yet: what open(..., "w") would have given it
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(CACHE_FILE)), suffix=".tmp")
+    try:
+        try:
+            raw = os.fdopen(fd, "wb")
+        except BaseException:
+            os.close(fd)
+            raise
+        with raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+            f.write(payload)
+        os.chmod(tmp_path, mode)  # mkstemp always creates 0600
+        os.replace(tmp_path, CACHE_FILE)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_cache():
+    """
+    Return the cache record written by save_cache, or None when there is no
+    cache, it is unreadable (truncated/corrupt), or it was written for a
+    different event/season/tournament level.
+    """
+    if os.path.exists(CACHE_FILE):
+        try:
+            with gzip.open(CACHE_FILE, "rb") as f:
+                payload = f.read()
+            cache = orjson.loads(payload) if orjson is not None else json.loads(payload)
+        except (OSError, EOFError, ValueError):
+            log.warning("Ignoring unreadable cache file %s", CACHE_FILE)
+            return None
+        if isinstance(cache, dict) and cache.get("url") == schedule_url():
+            return cache
+    return None
+
+
+def refresh_cache(cache):
+    """
+    Bring the cache up to date and return (schedule_rows, status), where status is
+    "reused" (cache younger than CACHE_MIN_REFETCH_SECONDS, no request sent),
+    "revalidated" (conditional GET answered 304) or "fresh" (new data fetched).
+    """
+    if cache is not None:
+        if time.time() - os.path.getmtime(CACHE_FILE) < CACHE_MIN_REFETCH_SECONDS:
+            return cache["schedule"], "reused"
+        data, headers = fetch_schedule(cache.get("etag"), cache.get("last_modified"))
+        if data is None:
+            os.utime(CACHE_FILE)  # revalidated: restart the refetch window
+            return cache["schedule"], "revalidated"
+    else:
+        data, headers = fetch_schedule()
+    schedule_rows = parse_schedule(data)
+    save_cache(schedule_rows, headers.get("ETag"), headers.get("Last-Modified"))
+    return schedule_rows, "fresh"
+
+
+def parse_schedule(data):
+    """
+    Normalize the API response into plain schedule rows in a single pass.
+    Rows are JSON-serializable, so this is also the form stored in the cache.
+    """
+    schedule = []
+    level = TOURNAMENT_LEVEL.capitalize()  # API spelling, e.g. "Qualification"
+    for match in data["Schedule"]:
+        if match["tournamentLevel"] != level:
+            continue
+        schedule.append({
+            "matchNumber": match["matchNumber"],
+            "time": match["startTime"],
+            "teams": [int(t["teamNumber"]) for t in match["teams"]]
+        })
+    return schedule
+
+
+def prepare_schedule(schedule):
+    """
+    Attach the derived per-match fields the generators read: the start
+    time's day number ("_day") and whole seconds on a single running clock
+    ("_secs"). The time is parsed once here, so break and gap checks for
+    every member are integer compares.
+    """
+    for row in schedule:
+        dt = datetime.fromisoformat(row["time"])
+        row["_day"] = dt.toordinal()
+        row["_secs"] = row["_day"] * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second
+    return schedule
+
+
+def insert_all_teams_done(schedule):
+    """
+    Insert a single 'AllTeamsDone' row after the match in which
+    all teams (excluded included) have appeared at least once.
+    The schedule must already be in time order (see main).
+    """
+    all_teams = set()
+    for row in schedule:
+        if row["matchNumber"] not in BREAK_ROW_LABELS:
+            all_teams.update(row["teams"])
+
+    encountered = set()
+    new_sched = []
+    inserted = False
+
+    for row in schedule:
+        new_sched.append(row)
+        if row["matchNumber"] not in BREAK_ROW_LABELS:
+            encountered.update(row["teams"])
+            if (not inserted) and (encountered == all_teams):
+                new_sched.append({
+                    "matchNumber": "AllTeamsDone",
+                    "time": "",
+                    "teams": []
+                })
+                inserted = True
+
+    return new_sched
+
+
+def unique_teams(schedule):
+    """
+    Return every team in the schedule once, in order of first appearance.
+    """
+    teams = {}
+    for row in schedule:
+        if row["matchNumber"] not in BREAK_ROW_LABELS:
+            teams.update(dict.fromkeys(row["teams"]))
+    return list(teams)
+
+
+def assign_scouting(schedule, members, min_teams, min_members, all_teams=None):
+    # checked once so the dictionary dumps below cost nothing with debug off
+    debug = log.isEnabledFor(logging.DEBUG)
+    log.debug("Building assignments for non-excluded teams...")
+    assignments = {m: [] for m in members}
+    assigned_sets = {m: set() for m in members}
+
+    # all_teams: unique teams in first-appearance order (computed once by the caller)
+    if all_teams is None:
+        all_teams = unique_teams(schedule)
+    team_assignments = {team: [] for team in all_teams if team not in EXCLUDED_TEAMS}
+
+    if debug:
+        log.debug("Found %d non-excluded teams: %s", len(team_assignments), list(team_assignments))
+
+    # Round-robin by index: team i takes the next min_members members after
+    # team i-1, so a team's members are distinct by construction.
+    per_team = min(min_members, len(members))
+    for i, team in enumerate(team_assignments):
+        for k in range(per_team):
+            mem = members[(i * per_team + k) % len(members)]
+            assignments[mem].append(team)
+            assigned_sets[mem].add(team)
+            team_assignments[team].append(mem)
+        if debug:
+            log.debug("Team %s => %s", team, team_assignments[team])
+
+    if debug:
+        log.debug("After ensuring min_members, assignments dictionary:")
+        for m in assignments:
+            log.debug("  %s: %s", m, assignments[m])
+
+    # Top members up from a shared rotating offset into the team list; a
+    # member looks at each team at most once, so this always terminates.
+    team_list = list(team_assignments)
+    offset = 0
+    for mem in assignments:
+        scanned = 0
+        while len(assignments[mem]) < min_teams and scanned < len(team_list):
+            t = team_list[offset % len(team_list)]
+            offset += 1
+            scanned += 1
+            if t not in assigned_sets[mem]:
+                assignments[mem].append(t)
+                assigned_sets[mem].add(t)
+                team_assignments[t].append(mem)
+
+    # No purge pass needed: both passes draw only from team_assignments,
+    # which never holds an excluded team.
+    if debug:
+        log.debug("Final assignment dictionary:")
+        for m in assignments:
+            log.debug("  %s: %s", m, assignments[m])
+
+    return assignments, team_assignments
+
+
+def excluded_team_label(team):
+    """
+    The italic label shown for a team nobody scouts, on every page.
+    """
+    return f"<i>Team {team} (Excluded)</i>"
+
+
+def generate_overall_schedule(schedule, assignments, team_assignments, generation_info):
+    annotated_schedule = []
+    previous_row = None
+
+    # each team's "Team N: members" line is the same in every match it plays
+    team_line = {t: f"<u>Team {t}</u>: {', '.join(mems)}" for t, mems in team_assignments.items()}
+    # excluded teams have no members (never keys above); their label is fixed too
+    team_line.update({t: excluded_team_label(t) for t in EXCLUDED_TEAMS})
+
+    for row in schedule:
+        if row["matchNumber"] == "AllTeamsDone":
+            annotated_schedule.append({
+                "matchNumber": "AllTeamsDone",
+                "time": "",
+                "teams": [],
+                "assigned_html": "",
+                "is_break": False
+            })
+            continue
+
+        if previous_row is not None:
+            # priority => if date changes => overnight
+            if row["_day"] != previous_row["_day"]:
+                annotated_schedule.append({
+                    "matchNumber": "Overnight",
+                    "time": "",
+                    "teams": [],
+                    "assigned_html": "",
+                    "is_break": True
+                })
+            else:
+                if row["_secs"] - previous_row["_secs"] >= LUNCH_BREAK_THRESHOLD_SECONDS:
+                    annotated_schedule.append({
+                        "matchNumber": "Lunch Break",
+                        "time": "",
+                        "teams": [],
+                        "assigned_html": "",
+                        "is_break": True
+                    })
+
+        overall_assigned = Markup("<br>".join(
+            team_line[t] if t in team_line else excluded_team_label(t)
+            for t in row["teams"]
+        ))
+
+        annotated_schedule.append({
+            "matchNumber": row["matchNumber"],
+            "time": row["time"],
+            "teams": row["teams"],
+            "assigned_html": overall_assigned,
+            "is_break": False
+        })
+
+        previous_row = row
+
+    return OVERALL_TEMPLATE.stream(annotated_schedule=annotated_schedule, generation_info=generation_info, assignments=assignments)
+
+
+def build_team_css(teams):
+    """
+    Build the per-team color rules for a member page as one string,
+    so the template emits it directly instead of looping in Jinja.
+    """
+    return "\n        ".join(
+        f".team-{t} {{ background-color: hsl({i * 60}, 70%, 90%); border: 1px solid black; }}"
+        for i, t in enumerate(teams)
+    )
+
+
+def build_team_spans(teams):
+    """
+    Format each team's member-page cell once: (plain, underlined).
+    Excluded teams get the same italic label in both slots.
+    """
+    spans = {}
+    for t in teams:
+        if t in EXCLUDED_TEAMS:
+            excluded = excluded_team_label(t)
+            spans[t] = (excluded, excluded)
+        else:
+            spans[t] = (
+                f"<span class='team team-{t}'>Team {t}</span>",
+                f"<span class='team team-{t}' style='text-decoration: underline;'>Team {t}</span>"
+            )
+    return spans
+
+
+def match_rows(schedule):
+    """
+    Drop break rows from a time-ordered schedule (see main), so the match
+    after any index is simply the next entry.
+    """
+    return [row for row in schedule if row["matchNumber"] not in BREAK_ROW_LABELS]
+
+
+def build_member_matches(rows, team_to_members):
+    """
+    For each member, list (index into rows, team) for every match holding
+    one of their teams. The team is the first of theirs in alliance order,
+    which is the one underlined on their page.
+    """
+    member_matches = {}
+    for i, row in enumerate(rows):
+        seen = set()
+        for t in row["teams"]:
+            # excluded teams are never assigned, so they map to no members
+            for mem in team_to_members.get(t, ()):
+                if mem not in seen:
+                    seen.add(mem)
+                    member_matches.setdefault(mem, []).append((i, t))
+    return member_matches
+
+
+def build_team_to_members(assignments):
+    """
+    Invert member -> teams into team -> members, keeping roster order.
+    """
+    team_to_members = {}
+    for mem, teams in assignments.items():
+        for t in teams:
+            team_to_members.setdefault(t, []).append(mem)
+    return team_to_members
+
+
+# member-page break rows are never modified once appended, so every page shares them
+MEMBER_BREAK_ROWS = {
+    label: {"matchNumber": label, "time": "", "gap": "", "teams": (), "is_break": True}
+    for label in ("Lunch Break", "Overnight")
+}
+
+
+def generate_member_schedule(member, assigned_teams, generation_info, team_to_members, member_matches, team_spans,
+                             schedule_sorted):
+    """
+    Render one member's page from the indexes main builds once for every page.
+    schedule_sorted is match_rows() of the time-ordered schedule, with the
+    "_day"/"_secs" fields added by prepare_schedule; member_matches is this
+    member's (index into schedule_sorted, team) list from build_member_matches.
+    Gaps and breaks are measured between consecutive entries, so order matters.
+    """
+    member_schedule = []
+    previous_assigned_row = None
+    previous_assigned_match_index = None
+    last_break_inserted = None
+
+    # Build top assigned-teams list with also assigned
+    assigned_teams_info = [
+        (t, ", ".join(other_m for other_m in team_to_members.get(t, ()) if other_m != member))
+        for t in assigned_teams
+    ]
+
+    # visit only the matches this member scouts
+    for i, assigned_team_for_this_member in member_matches:
+        row = schedule_sorted[i]
+        # Insert lunch/overnight if needed
+        if previous_assigned_row is not None:
+            if row["_day"] != previous_assigned_row["_day"]:
+                member_schedule.append(MEMBER_BREAK_ROWS["Overnight"])
+                last_break_inserted = "Overnight"
+            else:
+                if row["_secs"] - previous_assigned_row["_secs"] >= LUNCH_BREAK_THRESHOLD_SECONDS:
+                    member_schedule.append(MEMBER_BREAK_ROWS["Lunch Break"])
+                    last_break_inserted = "Lunch Break"
+                else:
+                    last_break_inserted = None
+        else:
+            last_break_inserted = None
+
+        # compute gap
+        if previous_assigned_row is None:
+            # first match for this member => 'First Match'
+            gap = "First Match"
+        elif last_break_inserted is not None:
+            gap = last_break_inserted
+        else:
+            # gap runs from the match right after the previous assigned one
+            diff_s = row["_secs"] - schedule_sorted[previous_assigned_match_index + 1]["_secs"]
+            if diff_s <= 0:
+                # 0 or negative => show 'N/A'
+                gap = "N/A"
+            else:
+                # whole minutes, rounded half-to-even in integer math
+                mins, rem = divmod(diff_s, 60)
+                if rem > 30 or (rem == 30 and mins % 2):
+                    mins += 1
+                gap = f"{mins} minutes"
+                if diff_s > GAP_UNDERLINE_THRESHOLD_SECONDS:
+                    gap = Markup(GAP_UNDERLINE_OPEN + gap + GAP_UNDERLINE_CLOSE)
+
+        # underline only the first occurrence of the member's team
+        underline_at = row["teams"].index(assigned_team_for_this_member)
+        styled_teams = [
+            team_spans[t][1] if j == underline_at else team_spans[t][0]
+            for j, t in enumerate(row["teams"])
+        ]
+
+        member_schedule.append({
+            "matchNumber": row["matchNumber"],
+            "time": row["time"],
+            "gap": gap,
+            "teams": styled_teams,
+            "is_break": False
+        })
+
+        previous_assigned_row = row
+        previous_assigned_match_index = i
+
+    return MEMBER_TEMPLATE.stream(
         member=member,
         member_schedule=member_schedule,
         assigned_teams_info=assigned_teams_info,
+        team_css=build_team_css(assigned_teams),
         generation_info=generation_info
     )
 
 
+def render_overall_file(schedule, assignments, team_assignments, generation_info):
+    """
+    Stream the overall schedule to disk and return the file name.
+    """
+    file_name = f"overall_schedule_{EVENT_CODE}_{SEASON}.html"
+    with open(file_name, "w") as f:
+        generate_overall_schedule(schedule, assignments, team_assignments, generation_info).dump(f)
+    return file_name
+
+
+def render_member_file(member, generation_info, full_assignments, team_to_members, member_matches, team_spans,
+                       schedule_sorted):
+    """
+    Stream one member's schedule to disk and return the file name.
+    """
+    safe_name = member.replace(' ', '_')
+    file_name = f"individual_{safe_name}_{EVENT_CODE}_{SEASON}_schedule.html"
+    with open(file_name, "w") as f:
+        generate_member_schedule(
+            member=member,
+            assigned_teams=full_assignments[member],
+            generation_info=generation_info,
+            team_to_members=team_to_members,
+            member_matches=member_matches.get(member, []),
+            team_spans=team_spans,
+            schedule_sorted=schedule_sorted
+        ).dump(f)
+    return file_name
+
+
 def main():
+    logging.basicConfig(level=logging.DEBUG if DEBUG else logging.INFO, format="%(levelname)s: %(message)s")
     now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     use_cache = input("Use cached data? (yes/no): ").strip().lower() == "yes"
+    cache = load_cache()
     if use_cache:
-        data = load_cache()
-        if data:
+        if cache:
+            schedule_rows = cache["schedule"]
             mtime = os.path.getmtime(CACHE_FILE)
             cache_time_str = datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M:%S")
             generation_info = (
@@ -449,64 +718,73 @@ def main():
             )
         else:
             print("No cache found. Fetching data from API.")
-            data = fetch_schedule()
-            save_cache(data)
+            schedule_rows, _ = refresh_cache(None)
             generation_info = (
                 f"No valid cache. Fresh fetch at {now_str}, "
                 f"event: {EVENT_CODE}, year: {SEASON}"
             )
     else:
-        data = fetch_schedule()
-        save_cache(data)
-        generation_info = (
-            f"Fetched new data at {now_str}, "
-            f"event: {EVENT_CODE}, year: {SEASON}"
-        )
+        schedule_rows, status = refresh_cache(cache)
+        if status == "fresh":
+            generation_info = (
+                f"Fetched new data at {now_str}, "
+                f"event: {EVENT_CODE}, year: {SEASON}"
+            )
+        elif status == "reused":
+            cache_time_str = datetime.fromtimestamp(os.path.getmtime(CACHE_FILE)).strftime("%Y-%m-%d %H:%M:%S")
+            generation_info = (
+                f"Used recent cache from {cache_time_str}, generated at {now_str}, "
+                f"event: {EVENT_CODE}, year: {SEASON}"
+            )
+        else:
+            generation_info = (
+                f"Cached data confirmed current at {now_str}, "
+                f"event: {EVENT_CODE}, year: {SEASON}"
+            )
 
-    # Build raw schedule from API
-    raw_schedule = [
-        {
-            "matchNumber": match["matchNumber"],
-            "time": match["startTime"],
-            "teams": [int(t["teamNumber"]) for t in match["teams"]]
-        }
-        for match in data["Schedule"]
-        if match["tournamentLevel"] == TOURNAMENT_LEVEL.capitalize()
-    ]
-    print("DEBUG: Raw schedule from API:\n", raw_schedule, "\n")
+    # parse_schedule already built the rows; derive the time fields and order them
+    log.debug("Raw schedule from API: %s", schedule_rows)
+    raw_schedule = prepare_schedule(schedule_rows)
+    # sorted once here; every later step relies on time order
+    raw_schedule.sort(key=itemgetter("time"))
 
     # Insert AllTeamsDone
     schedule_with_all = insert_all_teams_done(raw_schedule)
 
     # do assignment
+    all_teams = unique_teams(schedule_with_all)
     assignments, team_assignments = assign_scouting(
         schedule_with_all,
         SCOUTING_MEMBERS,
         MIN_TEAMS_PER_MEMBER,
-        MIN_MEMBERS_PER_TEAM
+        MIN_MEMBERS_PER_TEAM,
+        all_teams=all_teams
     )
 
-    # overall schedule
-    overall_html = generate_overall_schedule(schedule_with_all, assignments, team_assignments, generation_info)
-    overall_filename = f"overall_schedule_{EVENT_CODE}_{SEASON}.html"
-    with open(overall_filename, "w") as f:
-        f.write(overall_html)
-    print(f"Generated overall schedule: {overall_filename}")
+    # team -> members index shared by every member page
+    team_to_members = build_team_to_members(assignments)
+    # chronological match rows, sorted once for every member page
+    schedule_sorted = match_rows(schedule_with_all)
+    # member -> the (match index, team) pairs they scout, in one pass over the schedule
+    member_matches = build_member_matches(schedule_sorted, team_to_members)
+    # every team's cell HTML, formatted once for all member pages
+    team_spans = build_team_spans(all_teams)
 
-    # individual's schedule
+    # the overall page is a single small file, so it is written here directly
+    print(f"Generated overall schedule: {render_overall_file(schedule_with_all, assignments, team_assignments, generation_info)}")
+
+    # individual schedules, rendered and written one after another: each page
+    # takes well under a millisecond, far less than starting a worker process
     for member in SCOUTING_MEMBERS:
-        member_schedule_html = generate_member_schedule(
-            member=member,
-            schedule=schedule_with_all,
-            team_assignments=team_assignments,
-            assigned_teams=assignments[member],
+        file_name = render_member_file(
+            member,
             generation_info=generation_info,
-            full_assignments=assignments
+            full_assignments=assignments,
+            team_to_members=team_to_members,
+            member_matches=member_matches,
+            team_spans=team_spans,
+            schedule_sorted=schedule_sorted
         )
-        safe_name = member.replace(' ', '_')
-        file_name = f"individual_{safe_name}_{EVENT_CODE}_{SEASON}_schedule.html"
-        with open(file_name, "w") as f:
-            f.write(member_schedule_html)
         print(f"Generated schedule for {member}: {file_name}")
 
 